@@ -1,23 +1,22 @@
 import os
 import asyncio
-import sys
-
-import asyncio
-import platform
-
-
 
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Optional
-from openai import OpenAI
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
-import asyncio
-from playwright.async_api import async_playwright
+import httpx
+import numpy as np
+from playwright.async_api import async_playwright, expect
 import logging
-import json
+import orjson
 import re
-import base64
+import copy
+import hashlib
+import uuid
+from cachetools import TTLCache
 
 
 
@@ -26,39 +25,65 @@ load_dotenv()
 app = FastAPI(
     title="Browser Automation API",
     description="API for natural language browser automation",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-print(os.getenv("OPENAI_API_KEY", "https://api.openai.com/v1"))
+# Async client so LLM calls don't block the event loop, over a pooled
+# HTTP/2 transport that amortizes TLS handshakes across requests
+http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+)
 
-client = OpenAI(
+client = AsyncOpenAI(
     base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-    api_key=os.getenv("OPENAI_API_KEY")
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=http_client
 )
 
-class CommandRequest(BaseModel):
-    command: str
-    url: Optional[str] = None
-    max_steps: Optional[int] = 5
-    credentials: Optional[dict] = None
-
-class AutomationResponse(BaseModel):
-    success: bool
-    message: str
-    data: Optional[dict] = None
-    screenshot: Optional[str] = None
-
-
-async def interpret_command(natural_language: str) -> dict:
-    """Convert natural language to automation script with proper JSON parsing"""
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": """
+# Placeholders the model is told to emit instead of real credentials, and a
+# compiled matcher for password-ish selectors
+USER_SENTINEL = "YOUR_USERNAME"
+PASS_SENTINEL = "YOUR_PASSWORD"
+PW_RE = re.compile(r"password", re.I)
+
+# Cap concurrent browser contexts so a burst of requests can't exhaust memory
+MAX_CONCURRENT_CONTEXTS = int(os.getenv("MAX_CONCURRENT_CONTEXTS", "4"))
+context_semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONTEXTS)
+
+
+@app.on_event("startup")
+async def startup_browser():
+    """Launch one Chromium instance for the process; requests share it via fresh contexts"""
+    app.state.playwright = await async_playwright().start()
+    app.state.browser = await app.state.playwright.chromium.launch(
+        headless=True,
+        args=[
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--disable-gpu",
+            "--disable-blink-features=AutomationControlled",
+            "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        ],
+        timeout=60000
+    )
+    logger.info("Browser pool ready")
+
+
+@app.on_event("shutdown")
+async def shutdown_browser():
+    await app.state.browser.close()
+    await app.state.playwright.stop()
+
+
+# Static system prompt, built once at import. Keeping it byte-identical across
+# calls (and ahead of the volatile user message) lets OpenAI's automatic prompt
+# caching discount the prefix tokens on every call after the first.
+SYSTEM_PROMPT = """
                 You are a browser automation expert. Convert the user's natural language command into a JSON structure.
                 The JSON should include the starting URL if not provided and have an "actions" array with these possible action types:
 
@@ -73,7 +98,7 @@ async def interpret_command(natural_language: str) -> dict:
                 - like_post: {index: number} (likes the nth post in the feed)
                 - comment_post: {index: number, text: string} (comments on the nth post)
                 - share_post: {index: number} (shares the nth post)
-                
+
                 Example input: "Login to LinkedIn and search for playwright jobs"
                 Example output: {
                     "starting_url": "https://linkedin.com",
@@ -88,51 +113,347 @@ async def interpret_command(natural_language: str) -> dict:
                         {"type": "like_post", "index": 1}
                     ]
                 }
-                 
-                IMPORTANT: 
+
+                IMPORTANT:
                  1. Never include actual credentials in the response
                 2. Every action must have a "type" field as the first key
-                """},
+                """
+
+# Cache interpreted commands so repeated natural-language inputs skip the
+# gpt-4o round-trip entirely (same command == same plan at temperature 0)
+interpret_cache = TTLCache(maxsize=1024, ttl=3600)
+interpret_cache_lock = asyncio.Lock()
+
+# Semantic fallback for the exact-match cache: differently phrased commands
+# with the same intent reuse a stored plan when their embeddings are close
+SEMANTIC_SIMILARITY_THRESHOLD = 0.92
+SEMANTIC_CACHE_MAX = 10000
+semantic_embeddings = []  # unit-norm vectors, parallel to semantic_plans
+semantic_plans = []
+semantic_matrix = None  # stacked copy of semantic_embeddings, rebuilt lazily
+semantic_cache_lock = asyncio.Lock()
+
+
+async def semantic_cache_lookup(command: str):
+    """Embed the command and return (embedding, cached plan or None)"""
+    global semantic_matrix
+
+    emb_response = await client.embeddings.create(
+        model="text-embedding-3-small",
+        input=command
+    )
+    q = np.asarray(emb_response.data[0].embedding)
+    q /= np.linalg.norm(q)
+
+    async with semantic_cache_lock:
+        if not semantic_embeddings:
+            return q, None
+        if semantic_matrix is None:
+            semantic_matrix = np.vstack(semantic_embeddings)
+        # vectors are unit-norm, so the matmul gives cosine similarity
+        sims = semantic_matrix @ q
+        best = int(np.argmax(sims))
+        if sims[best] > SEMANTIC_SIMILARITY_THRESHOLD:
+            logger.info(f"Semantic cache hit (similarity {sims[best]:.3f})")
+            # Copy so the caller's credential injection can't contaminate
+            # the stored plan
+            return q, copy.deepcopy(semantic_plans[best])
+    return q, None
+
+
+async def semantic_cache_store(embedding, plan: dict):
+    """Remember a plan under its command embedding, evicting oldest first"""
+    global semantic_matrix
+    async with semantic_cache_lock:
+        if len(semantic_embeddings) >= SEMANTIC_CACHE_MAX:
+            semantic_embeddings.pop(0)
+            semantic_plans.pop(0)
+        semantic_embeddings.append(embedding)
+        semantic_plans.append(copy.deepcopy(plan))
+        semantic_matrix = None
+
+class CommandRequest(BaseModel):
+    command: str
+    url: Optional[str] = None
+    max_steps: Optional[int] = 5
+    credentials: Optional[dict] = None
+    include_screenshot: Optional[bool] = False
+    debug: Optional[bool] = False
+    block_resources: Optional[bool] = True
+
+class AutomationResponse(BaseModel):
+    success: bool
+    message: str
+    data: Optional[dict] = None
+    screenshot_url: Optional[str] = None
+
+class TaskResponse(BaseModel):
+    task_id: str
+    status: str
+    status_url: str
+
+class PlanAction(BaseModel):
+    """One step of a model-produced plan; extra keys vary by action type"""
+    type: str
+
+    class Config:
+        extra = "allow"
+
+class Plan(BaseModel):
+    """Shape of the JSON interpret_command expects back from the model"""
+    starting_url: Optional[str] = None
+    actions: List[PlanAction]
+
+
+# In-process job store: /interact queues an automation run and returns
+# immediately; /status/{task_id} is polled for the result. Finished tasks
+# expire after an hour so the store doesn't grow unbounded.
+tasks = TTLCache(maxsize=1024, ttl=3600)
+
+# Strong references to in-flight asyncio tasks; the event loop only keeps
+# weak ones, so without this a running automation could be garbage-collected
+background_tasks = set()
+
+# Screenshot bytes stay out of the JSON body: they are stored here under a
+# UUID and served as raw JPEG from /screenshot/{id}
+screenshots = TTLCache(maxsize=256, ttl=3600)
+
+
+async def store_screenshot(page, full_page: bool = False) -> str:
+    """Capture a JPEG screenshot and return the path it is served from"""
+    shot_id = uuid.uuid4().hex
+    screenshots[shot_id] = await page.screenshot(type="jpeg", quality=70, full_page=full_page)
+    return f"/screenshot/{shot_id}"
+
+
+async def run_automation_task(task_id: str, actions: list, starting_url: str = None, include_screenshot: bool = False, debug: bool = False, block_resources: bool = True):
+    """Background wrapper that records the outcome of an automation run"""
+    # Grab the entry once; it may already have been evicted from the bounded
+    # store, in which case the run still completes but has nowhere to report
+    entry = tasks.get(task_id)
+    try:
+        if entry is not None:
+            entry["status"] = "running"
+        result = await execute_actions(actions, starting_url, include_screenshot, debug, block_resources)
+        if entry is not None:
+            entry["status"] = "done"
+            entry["result"] = result
+    except Exception as e:
+        logger.error(f"Background task {task_id} failed: {str(e)}")
+        if entry is not None:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+
+
+async def interpret_command(natural_language: str) -> dict:
+    """Convert natural language to automation script with proper JSON parsing"""
+    cache_key = hashlib.sha256(natural_language.strip().lower().encode()).hexdigest()
+    async with interpret_cache_lock:
+        cached = interpret_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Interpret cache hit, skipping LLM call")
+        # Callers mutate the plan (credential injection), so never hand out
+        # the cached object itself
+        return copy.deepcopy(cached)
+
+    # Exact match missed; try semantically equivalent phrasings before
+    # paying for a gpt-4o call. Embedding failures just fall through.
+    embedding = None
+    try:
+        embedding, plan = await semantic_cache_lookup(natural_language)
+        if plan is not None:
+            return plan
+    except Exception as e:
+        logger.warning(f"Semantic cache lookup failed: {str(e)}")
+
+    try:
+        response = await client.chat.completions.create(
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": natural_language}
             ],
-            temperature=0.3,
+            temperature=0,  # deterministic so caching the parsed plan is safe
             response_format={ "type": "json_object" },
             max_tokens=1000
         )
-        
+
+        try:
+            cached_tokens = response.usage.prompt_tokens_details.cached_tokens
+            logger.info(f"Prompt cache: {cached_tokens}/{response.usage.prompt_tokens} input tokens cached")
+        except AttributeError:
+            pass  # provider doesn't report prompt cache usage
+
+        # response_format={"type": "json_object"} guarantees bare JSON, so
+        # parse it directly and validate the plan shape up front
         response_content = response.choices[0].message.content
-        json_str = re.sub(r'```json|```', '', response_content).strip()
-        return json.loads(json_str)
-    except json.JSONDecodeError as e:
+        parsed = Plan(**orjson.loads(response_content)).dict()
+
+        async with interpret_cache_lock:
+            interpret_cache[cache_key] = copy.deepcopy(parsed)
+        if embedding is not None:
+            await semantic_cache_store(embedding, parsed)
+        return parsed
+    except orjson.JSONDecodeError as e:
         logger.error(f"JSON parsing error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to parse command response")
+    except ValidationError as e:
+        logger.error(f"Plan validation error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Model returned an invalid action plan")
     except Exception as e:
         logger.error(f"Command interpretation error: {str(e)}")
         raise HTTPException(status_code=500, detail="Command interpretation failed")
 
-async def execute_actions(actions: list, starting_url: str = None) -> AutomationResponse:
+async def handle_navigate(page, action):
+    await page.goto(action["url"], wait_until="networkidle")
+
+async def handle_click(page, action):
+    # Locators auto-wait for actionability, so no separate
+    # wait_for_selector round-trip is needed
+    await page.locator(action["selector"]).click(timeout=10000)
+    await page.wait_for_load_state("domcontentloaded")
+
+async def handle_fill(page, action):
+    await page.locator(action["selector"]).fill(action["text"], timeout=10000)
+
+async def handle_press(page, action):
+    if "selector" not in action:
+        raise Exception("Press action requires a selector parameter")
+    await page.locator(action["selector"]).press(action["key"], timeout=10000)
+
+async def handle_wait(page, action):
+    await page.wait_for_timeout(action["timeout"])
+
+async def handle_scroll(page, action):
+    await page.evaluate(f"window.scrollBy(0, {action['pixels']})")
+
+async def handle_login(page, action):
+    await page.locator(action["username_selector"]).fill(action["username"], timeout=10000)
+    await page.locator(action["password_selector"]).fill(action["password"], timeout=10000)
+    await page.locator(action["submit_selector"]).click(timeout=10000)
+
+async def handle_search(page, action):
+    await page.locator(action["search_selector"]).fill(action["query"], timeout=10000)
+    await page.locator(action["submit_selector"]).click(timeout=10000)
+
+async def handle_like_post(page, action):
+    logger.info("Starting like_post action...")
+
+    logger.info("Waiting for feed content...")
+    await page.wait_for_selector(".scaffold-finite-scroll__content", timeout=15000)
+    logger.info("Feed content loaded successfully")
+
+    logger.info("Locating posts...")
+    posts = page.locator("[data-id^='urn:li:activity']")
+    post_count = await posts.count()
+    logger.info(f"Found {post_count} posts")
+
+    if not post_count:
+        logger.error("No posts found on page")
+        raise Exception("No posts found - may need different selectors")
+
+    post_index = min(action.get("index", 1) - 1, post_count - 1)
+    logger.info(f"Selecting post at index {post_index + 1}")
+
+    # nth() resolves lazily in the browser instead of materializing a
+    # handle for every post in the feed over CDP
+    post = posts.nth(post_index)
+    logger.info("Scrolling post into view...")
+    await post.scroll_into_view_if_needed()
+
+    logger.info("Locating like button...")
+    like_button = post.locator(
+        "button.react-button__trigger[aria-label^='React'], "
+        "button.social-actions-button, "
+        "button[aria-label*='Like']"
+    ).first
+
+    if await like_button.count() == 0:
+        logger.warning("Primary selectors failed, trying fallbacks...")
+        like_button = post.locator(
+            "button:has(svg[data-icon*='thumb']), "
+            "button:has(img[alt='like'])"
+        ).first
+        if await like_button.count() == 0:
+            logger.error("All like button selectors failed")
+            raise Exception("Like button not found")
+
+    # One evaluate instead of three get_attribute round-trips
+    current_state = await like_button.evaluate(
+        """btn => ({
+            aria_pressed: btn.getAttribute('aria-pressed') || 'null',
+            aria_label: btn.getAttribute('aria-label') || 'null',
+            classes: btn.className || 'null'
+        })"""
+    )
+    logger.info(f"CURRENT BUTTON STATE: {current_state}")
+
+    logger.info("Attempting to click like button...")
+    await like_button.evaluate("btn => { btn.click(); console.log('Like button clicked via JS') }")
+    try:
+        # Wait for the button to actually toggle instead of sleeping 3s
+        await expect(like_button).to_have_attribute("aria-pressed", "true", timeout=5000)
+    except Exception:
+        pass  # state comparison below decides success
+
+    new_state = await like_button.evaluate(
+        """btn => ({
+            aria_pressed: btn.getAttribute('aria-pressed') || 'null',
+            aria_label: btn.getAttribute('aria-label') || 'null',
+            classes: btn.className || 'null'
+        })"""
+    )
+    logger.info(f"NEW BUTTON STATE: {new_state}")
+
+    if (new_state["aria_pressed"] == current_state["aria_pressed"] or
+        new_state["aria_label"] == current_state["aria_label"]):
+        logger.error(f"State didn't change! Before: {current_state}, After: {new_state}")
+        raise Exception("Like action didn't register - button state unchanged")
+
+    logger.info("Like action successful!")
+    return {
+        "message": "Successfully liked post",
+        "debug": {"before": current_state, "after": new_state}
+    }
+
+
+# O(1) dispatch instead of a growing if/elif chain; handlers may return a
+# dict of extra detail that gets merged into the step result
+ACTION_HANDLERS = {
+    "navigate": handle_navigate,
+    "click": handle_click,
+    "fill": handle_fill,
+    "press": handle_press,
+    "wait": handle_wait,
+    "scroll": handle_scroll,
+    "login": handle_login,
+    "search": handle_search,
+    "like_post": handle_like_post,
+}
+
+
+async def execute_actions(actions: list, starting_url: str = None, include_screenshot: bool = False, debug: bool = False, block_resources: bool = True) -> AutomationResponse:
     """Execute browser automation actions"""
-    async with async_playwright() as p:
-       
-        browser = await p.chromium.launch(
-            headless=False,
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                "--start-maximized"
-            ],
-            timeout=60000  
-        )
-        
-        
-        context = await browser.new_context(
+    async with context_semaphore:
+        # The browser itself is launched once at startup; each request only
+        # pays for a lightweight context
+        context = await app.state.browser.new_context(
             viewport={'width': 1366, 'height': 768},
             locale='en-US'
         )
-        
-        
+
+        # Heavy assets don't matter for selector-driven automation; blocking
+        # them cuts page-load bytes and per-context memory. Callers whose
+        # selectors depend on images (or who want a faithful screenshot) can
+        # opt out with block_resources=false.
+        if block_resources and not include_screenshot:
+            await context.route(
+                "**/*.{png,jpg,jpeg,webp,gif,mp4,woff,woff2}",
+                lambda route: route.abort()
+            )
+
         page = await context.new_page()
-        
+
         try:
            
             if starting_url:
@@ -153,230 +474,154 @@ async def execute_actions(actions: list, starting_url: str = None) -> Automation
 
             results = {"steps": []}
 
-            for action in actions:
+            i = 0
+            while i < len(actions):
+                action = actions[i]
+
+                # Consecutive wait actions are independent timers: run them
+                # under gather so the batch costs max(timeout), not the sum.
+                # Mutating actions (click/fill/...) stay strictly sequential.
+                if action["type"] == "wait" and i + 1 < len(actions) and actions[i + 1]["type"] == "wait":
+                    batch = []
+                    while i < len(actions) and actions[i]["type"] == "wait":
+                        batch.append(actions[i])
+                        i += 1
+                    await asyncio.gather(*[page.wait_for_timeout(a["timeout"]) for a in batch])
+                    results["steps"].extend({"action": a, "success": True} for a in batch)
+                    continue
+                i += 1
+
                 step_result = {"action": action, "success": True}
-                
+
                 try:
                     action_type = action["type"]
                     logger.info(f"Executing action: {action_type}")
 
-                    if action_type == "navigate":
-                        await page.goto(action["url"], wait_until="networkidle")
-                    
-                    elif action_type == "click":
-                        await page.wait_for_selector(action["selector"], state="visible", timeout=10000)
-                        await page.click(action["selector"])
-                    
-                    elif action_type == "fill":
-                        selector = action["selector"]
-                        await page.wait_for_selector(selector, state="visible", timeout=10000)
-                        await page.fill(selector, action["text"])
-                    
-                    elif action_type == "press":
-                        if "selector" not in action:
-                            raise Exception("Press action requires a selector parameter")
-                        await page.wait_for_selector(action["selector"], state="visible", timeout=10000)
-                        await page.press(action["selector"], action["key"])
-                    
-                    elif action_type == "wait":
-                        await page.wait_for_timeout(action["timeout"])
-                    
-                    elif action_type == "scroll":
-                        await page.evaluate(f"window.scrollBy(0, {action['pixels']})")
-                    
-                    elif action_type == "login":
-                        
-                        await page.wait_for_selector(action["username_selector"], state="visible", timeout=10000)
-                        await page.fill(action["username_selector"], action["username"])
-                        
-                        
-                        await page.wait_for_selector(action["password_selector"], state="visible", timeout=10000)
-                        await page.fill(action["password_selector"], action["password"])
-                        
-                       
-                        await page.wait_for_selector(action["submit_selector"], state="visible", timeout=10000)
-                        await page.click(action["submit_selector"])
-                    
-                    elif action_type == "search":
-                        await page.wait_for_selector(action["search_selector"], state="visible", timeout=10000)
-                        await page.fill(action["search_selector"], action["query"])
-                        await page.click(action["submit_selector"])
-
-                    elif action_type == "like_post":
-                        try:
-                            logger.info("Starting like_post action...")
-                            
-                           
-                            logger.info("Waiting for feed content...")
-                            await page.wait_for_selector(".scaffold-finite-scroll__content", timeout=15000)
-                            logger.info("Feed content loaded successfully")
-                            
-                            
-                            logger.info("Locating posts...")
-                            posts = await page.query_selector_all("[data-id^='urn:li:activity']")
-                            logger.info(f"Found {len(posts)} posts")
-                            
-                            if not posts:
-                                logger.error("No posts found on page")
-                                raise Exception("No posts found - may need different selectors")
-
-                            post_index = min(action.get("index", 1) - 1, len(posts) - 1)
-                            logger.info(f"Selecting post at index {post_index + 1}")
-                            
-                            post = posts[post_index]
-                            logger.info("Scrolling post into view...")
-                            await post.scroll_into_view_if_needed()
-                            await page.wait_for_timeout(2000)
-
-                           
-                            logger.info("Locating like button...")
-                            like_button = await post.query_selector(
-                                "button.react-button__trigger[aria-label^='React'], "
-                                "button.social-actions-button, "
-                                "button[aria-label*='Like']"
-                            )
-                            
-                            if not like_button:
-                                logger.warning("Primary selectors failed, trying fallbacks...")
-                                like_button = await post.query_selector(
-                                    "button:has(svg[data-icon*='thumb']), "
-                                    "button:has(img[alt='like'])"
-                                )
-                                if not like_button:
-                                    logger.error("All like button selectors failed")
-                                    raise Exception("Like button not found")
-
-                          
-                            current_state = {
-                                "aria_pressed": await like_button.get_attribute("aria-pressed") or "null",
-                                "aria_label": await like_button.get_attribute("aria-label") or "null",
-                                "classes": await like_button.get_attribute("class") or "null"
-                            }
-                            print(f"DEBUG - CURRENT BUTTON STATE: {current_state}")  
-                            logger.info(f"CURRENT BUTTON STATE: {current_state}")  
-                            
-                            
-                            logger.info("Attempting to click like button...")
-                            await like_button.evaluate("btn => { btn.click(); console.log('Like button clicked via JS') }")
-                            await page.wait_for_timeout(3000)
-
-                            
-                            new_state = {
-                                "aria_pressed": await like_button.get_attribute("aria-pressed") or "null",
-                                "aria_label": await like_button.get_attribute("aria-label") or "null",
-                                "classes": await like_button.get_attribute("class") or "null"
-                            }
-                            print(f"DEBUG - NEW BUTTON STATE: {new_state}")  
-                            logger.info(f"NEW BUTTON STATE: {new_state}")
-
-                            
-                            if (new_state["aria_pressed"] == current_state["aria_pressed"] or 
-                                new_state["aria_label"] == current_state["aria_label"]):
-                                logger.error(f"State didn't change! Before: {current_state}, After: {new_state}")
-                                raise Exception("Like action didn't register - button state unchanged")
-
-                            logger.info("Like action successful!")
-                            return {
-                                "success": True,
-                                "message": "Successfully liked post",
-                                "debug": {
-                                    "before": current_state,
-                                    "after": new_state
-                                }
-                            }
-
-                        except Exception as e:
-                            logger.error(f"Like failed: {str(e)}", exc_info=True)
-                            return {
-                                "success": False,
-                                "message": str(e),
-                                "debug": {
-                                    "error": str(e),
-                                    "screenshot": base64.b64encode(await page.screenshot()).decode() if 'page' in locals() else None
-                                }
-                            }
-
-                    
-                    await page.wait_for_timeout(1000)
-                    
+                    handler = ACTION_HANDLERS.get(action_type)
+                    if handler is None:
+                        raise Exception(f"Unknown action type: {action_type}")
+
+                    detail = await handler(page, action)
+                    if detail:
+                        step_result.update(detail)
+
                 except Exception as e:
                     step_result["success"] = False
                     step_result["error"] = str(e)
                     logger.error(f"Action failed: {action} - {str(e)}")
-                    
-                    try:
-                        screenshot_bytes = await page.screenshot(type="png")
-                        step_result["screenshot"] = base64.b64encode(screenshot_bytes).decode("utf-8")
-                    except:
-                        pass
+
+                    # Screenshots are expensive (composite + encode); only
+                    # capture per-step failures when the caller asked to debug
+                    if debug:
+                        try:
+                            step_result["screenshot_url"] = await store_screenshot(page)
+                        except:
+                            pass
 
                 results["steps"].append(step_result)
 
-            
-            screenshot_bytes = await page.screenshot(type="png", full_page=True)
-            screenshot_b64 = base64.b64encode(screenshot_bytes).decode("utf-8")
+
+            screenshot_url = None
+            if include_screenshot:
+                screenshot_url = await store_screenshot(page)
 
             return AutomationResponse(
                 success=True,
                 message="Automation completed",
                 data=results,
-                screenshot=f"data:image/png;base64,{screenshot_b64}"
+                screenshot_url=screenshot_url
             )
-            
+
         except Exception as e:
             logger.error(f"Automation failed: {str(e)}")
-            
-            try:
-                screenshot_bytes = await page.screenshot(type="png")
-                screenshot_b64 = base64.b64encode(screenshot_bytes).decode("utf-8")
-                return AutomationResponse(
-                    success=False,
-                    message=f"Automation failed: {str(e)}",
-                    screenshot=f"data:image/png;base64,{screenshot_b64}"
-                )
-            except:
-                return AutomationResponse(
-                    success=False,
-                    message=f"Automation failed: {str(e)}"
-                )
+
+            screenshot_url = None
+            if include_screenshot:
+                try:
+                    screenshot_url = await store_screenshot(page)
+                except:
+                    pass
+            return AutomationResponse(
+                success=False,
+                message=f"Automation failed: {str(e)}",
+                screenshot_url=screenshot_url
+            )
         finally:
-            
-            await asyncio.sleep(1)
             await context.close()
-            await browser.close()
 
-@app.post("/interact", response_model=AutomationResponse)
+@app.post("/interact", response_model=TaskResponse)
 async def interact(request: CommandRequest):
     """Main endpoint for natural language browser automation"""
     try:
         actions_data = await interpret_command(request.command)
         logger.info(f"Interpreted actions: {actions_data}")
-        
-        if not isinstance(actions_data, dict) or "actions" not in actions_data:
-            raise HTTPException(status_code=400, detail="Invalid actions format")
-            
-        
+
+
         starting_url = request.url if request.url else actions_data.get("starting_url")
         
         
         if request.credentials:
+            username = request.credentials.get("username", "")
+            password = request.credentials.get("password", "")
             for action in actions_data["actions"]:
                 if action["type"] == "fill":
-                
-                    if "text" in action and action["text"] == "YOUR_USERNAME":
-                        action["text"] = request.credentials.get("username", "")
-                  
-                    elif "password" in action["selector"].lower() or ("text" in action and action["text"] == "YOUR_PASSWORD"):
-                        action["text"] = request.credentials.get("password", "")
+                    # Cheap sentinel compares first; the case-insensitive
+                    # selector regex only runs when neither placeholder matched
+                    text = action.get("text")
+                    if text == USER_SENTINEL:
+                        action["text"] = username
+                    elif text == PASS_SENTINEL or PW_RE.search(action["selector"]):
+                        action["text"] = password
                 elif action["type"] == "login" and "username_selector" in action:
-                   
-                    action["username"] = request.credentials.get("username", "")
-                    action["password"] = request.credentials.get("password", "")
+                    action["username"] = username
+                    action["password"] = password
         
-        return await execute_actions(actions_data["actions"], starting_url)
-    
+        task_id = uuid.uuid4().hex
+        tasks[task_id] = {"status": "queued", "result": None}
+        task = asyncio.create_task(run_automation_task(
+            task_id,
+            actions_data["actions"],
+            starting_url,
+            bool(request.include_screenshot),
+            bool(request.debug),
+            bool(request.block_resources)
+        ))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+        return TaskResponse(
+            task_id=task_id,
+            status="queued",
+            status_url=f"/status/{task_id}"
+        )
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"API error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/status/{task_id}")
+async def task_status(task_id: str):
+    """Poll the state of a queued automation run"""
+    task = tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Unknown task id")
+
+    body = {"task_id": task_id, "status": task["status"]}
+    if task["status"] == "done":
+        result = task["result"]
+        body["result"] = result.dict() if isinstance(result, AutomationResponse) else result
+    elif task["status"] == "failed":
+        body["error"] = task.get("error")
+    # Return the response directly so FastAPI doesn't walk the (potentially
+    # large) step results through jsonable_encoder a second time
+    return ORJSONResponse(content=body)
+
+@app.get("/screenshot/{shot_id}")
+async def get_screenshot(shot_id: str):
+    """Serve a captured screenshot as raw JPEG"""
+    shot = screenshots.get(shot_id)
+    if shot is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired screenshot id")
+    return Response(content=shot, media_type="image/jpeg")
\ No newline at end of file